@@ -1,29 +1,64 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from cachetools import TTLCache
+import jwt
 from pydantic import BaseModel
-from passlib.hash import bcrypt
-from database import Database
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from database import Database, get_db
+from models import User
 from dotenv import load_dotenv
 import os
+import hashlib
+import time
 from datetime import datetime, timedelta, UTC
 
 load_dotenv()
 
-db = Database()
-
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "default-secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Argon2id parameters for newly hashed passwords (OWASP baseline: 19 MiB, t=2, p=1).
+# Hashes are stored as PHC strings, which record the parameters they were made with.
+# TESTING=1 drops to the library minimum so test runs don't pay for the KDF.
+if os.getenv("TESTING") == "1":
+    password_hasher = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
+else:
+    password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Validated tokens are cached for at most this many seconds, which bounds how
+# long a deleted user or revoked token keeps working.
+TOKEN_CACHE_TTL_SECONDS = 300
+_TOKEN_CACHE = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL_SECONDS)
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 class TokenData(BaseModel):
     email: str
 
+def hash_password(password: str) -> str:
+    """Hash a password with Argon2id."""
+    return password_hasher.hash(password)
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Check a password against a stored Argon2 hash or a legacy bcrypt hash."""
+    if hashed.startswith("$argon2"):
+        try:
+            return password_hasher.verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+def password_needs_rehash(hashed: str) -> bool:
+    """Whether a stored hash is legacy bcrypt or uses outdated Argon2 parameters."""
+    return not hashed.startswith("$argon2") or password_hasher.check_needs_rehash(hashed)
+
 def create_access_token(data: dict):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -40,8 +75,15 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Database = Depends(get_db)) -> User:
     """Retrieve the current authenticated user from a JWT token."""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _TOKEN_CACHE.get(key)
+    if cached is not None:
+        user, expires_at = cached
+        if time.time() < expires_at:
+            return user
+        _TOKEN_CACHE.pop(key, None)
     credentials_exception = HTTPException(
         status_code=401,
         detail="Invalid or expired token",
@@ -53,9 +95,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
-    except JWTError:
+        exp = payload.get("exp")
+    except jwt.InvalidTokenError:
         raise credentials_exception
-    user = db.get_user_by_email(token_data.email)
-    if user is None:
+    # Only cache misses reach the database; do that wait off the event loop
+    user_data = await run_in_threadpool(db.get_user_by_email, token_data.email)
+    if user_data is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
\ No newline at end of file
+    user = User(
+        id=user_data["id"],
+        name=user_data["name"],
+        email=user_data["email"],
+        password=user_data["password"],
+        role=user_data["role"]
+    )
+    # The cache TTL caps the entry's lifetime; the token's own exp may end it sooner.
+    _TOKEN_CACHE[key] = (user, exp if exp is not None else float("inf"))
+    return user
@@ -0,0 +1,74 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Configure the app before main (and its Database) is imported: a throwaway
+# database, and cheap password hashing. The path is assigned rather than
+# defaulted: xdist workers inherit the controller's environment, and each
+# process (controller or worker) needs a database file of its own.
+_TEST_DB_DIR = tempfile.mkdtemp()
+# The app closes the database on shutdown; the directory (with any -wal/-shm
+# files) goes when the process exits
+atexit.register(shutil.rmtree, _TEST_DB_DIR, ignore_errors=True)
+os.environ["DATABASE_PATH"] = os.path.join(_TEST_DB_DIR, "test_events.db")
+os.environ.setdefault("TESTING", "1")
+
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from auth import create_access_token, hash_password
+from main import app, db, manager, scheduler
+from models import Event, User
+
+# Hashed once at import; the KDF is deliberately slow and the value never changes
+_ORG_PW_HASH = hash_password("password123")
+
+@pytest.fixture(scope="session")
+def client(organizer_user):
+    # Entering the client runs the app lifespan once for the whole session
+    with TestClient(app) as c:
+        # Authenticated as the organizer; /login itself is covered by test_login_success
+        token = create_access_token(data={"sub": organizer_user.email})
+        c.headers["Authorization"] = f"Bearer {token}"
+        yield c
+
+@pytest.fixture(scope="session")
+def organizer_user():
+    user = User(
+        id="user1",
+        name="Test Organizer",
+        email="organizer@example.com",
+        password=_ORG_PW_HASH,
+        role="organizer"
+    )
+    db.add_user(user)
+    return user
+
+@pytest.fixture(scope="session")
+def seeded_event(organizer_user):
+    """ID of an event present in every test, inserted directly instead of over HTTP."""
+    event = Event(
+        id="seeded_event",
+        title="Seeded Event",
+        date=datetime(2025, 6, 1, 10, 0),
+        capacity=50,
+        duration_hours=2.0,
+        type="basic",
+        instructor="John Doe",
+        created_by=organizer_user.id
+    )
+    manager.add_event(event)
+    scheduler.schedule_event(event)
+    return event.id
+
+@pytest.fixture(scope="session")
+def db_snapshot(organizer_user, seeded_event):
+    """Database state after session-wide seeding."""
+    return db.backup()
+
+@pytest.fixture(autouse=True)
+def rollback_db(db_snapshot):
+    """Undo whatever each test wrote to the database."""
+    yield
+    db.restore(db_snapshot)
@@ -1,14 +1,80 @@
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
+import aiosqlite
+
+# Number of read-only connections kept open alongside the writer
+READ_POOL_SIZE = 8
+
+# How long a read waits for a pooled connection before giving up, in seconds
+READ_POOL_TIMEOUT_SECONDS = 5
+
+# Rows fetched at a time by streaming readers
+STREAM_FETCH_ROWS = 500
+
+# Applied to every connection, sync or async
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Columns selected as "col [DATETIME]" come back as datetime objects
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
 
 class Database:
-    def __init__(self, db_name="events.db"):
+    def __init__(self, db_name="events.db", read_pool_size=READ_POOL_SIZE):
         """
-        Initialize SQLite database connection.
+        Initialize SQLite database connections.
+        All mutations go through a single writer connection; SELECTs borrow
+        one of a pool of read-only connections so they can run concurrently
+        under WAL.
         Note: For production, consider using PostgreSQL for better scalability.
         """
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.db_name = db_name
+        self.conn = self._connect()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # The writer is shared across request threads; serialize writes so
+        # one thread's commit cannot interleave with another's statements.
+        self._write_lock = threading.Lock()
+        # Bumped on every change to the events table so callers can cache reads
+        self._events_version = 0
         self.create_tables()
+        self._read_pool = queue.Queue(maxsize=read_pool_size)
+        for _ in range(read_pool_size):
+            reader = self._connect(isolation_level=None)
+            reader.execute("PRAGMA query_only=ON")
+            self._read_pool.put(reader)
+
+    def _connect(self, **kwargs):
+        """Open a connection with the per-connection PRAGMAs applied."""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, detect_types=sqlite3.PARSE_COLNAMES, **kwargs)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @property
+    def events_version(self):
+        """Counter that changes whenever events are added, updated or deleted."""
+        return self._events_version
+
+    @contextmanager
+    def get_conn(self):
+        """Borrow a read-only connection from the pool."""
+        try:
+            conn = self._read_pool.get(timeout=READ_POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError("no read connection available: pool exhausted") from None
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
 
     def create_tables(self):
         """Create database tables with appropriate indexes."""
@@ -61,152 +127,312 @@ class Database:
         ''')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_event_attendees_event_id ON event_attendees(event_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_created_by ON events(created_by)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_range ON schedule(start_ts, end_ts)')
         self.conn.commit()
 
     def add_event(self, event):
         """Add an event to the database."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR IGNORE INTO events (id, title, date, capacity, duration_hours, type, instructor, created_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (event.id, event.title, event.date.isoformat(), event.capacity, event.duration_hours, event.type, event.instructor, event.created_by))
-        self.conn.commit()
-        return cursor.rowcount > 0
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO events (id, title, date, capacity, duration_hours, type, instructor, created_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (event.id, event.title, event.date.isoformat(), event.capacity, event.duration_hours, event.type, event.instructor, event.created_by))
+            self.conn.commit()
+            self._events_version += 1
+            return cursor.rowcount > 0
+
+    def add_events_bulk(self, events):
+        """
+        Add many events in a single transaction. Returns the number inserted.
+        Unlike the create route (manager.add_event plus scheduler.schedule_event),
+        this writes no schedule rows: the events are not conflict-checked and
+        never come back from get_next_scheduled.
+        """
+        with self._write_lock, self.conn:
+            cursor = self.conn.executemany('''
+                INSERT OR IGNORE INTO events (id, title, date, capacity, duration_hours, type, instructor, created_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(e.id, e.title, e.date.isoformat(), e.capacity, e.duration_hours, e.type, e.instructor, e.created_by) for e in events])
+            self._events_version += 1
+            return cursor.rowcount
 
     def get_event(self, event_id):
         """Retrieve an event by ID."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM events WHERE id = ?', (event_id,))
-        row = cursor.fetchone()
-        if row:
-            return {
-                "id": row[0], "title": row[1], "date": row[2], "capacity": row[3],
-                "duration_hours": row[4], "type": row[5], "instructor": row[6], "created_by": row[7]
-            }
-        return None
-
-    def list_events(self):
-        """Retrieve all events."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM events')
-        rows = cursor.fetchall()
-        return [{
-            "id": r[0], "title": r[1], "date": r[2], "capacity": r[3],
-            "duration_hours": r[4], "type": r[5], "instructor": r[6], "created_by": r[7]
-        } for r in rows]
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, title, date AS "date [DATETIME]", capacity, duration_hours, type, instructor, created_by
+                FROM events WHERE id = ?
+            ''', (event_id,))
+            row = cursor.fetchone()
+            if row:
+                return {
+                    "id": row[0], "title": row[1], "date": row[2], "capacity": row[3],
+                    "duration_hours": row[4], "type": row[5], "instructor": row[6], "created_by": row[7]
+                }
+            return None
+
+    def iter_events(self):
+        """Yield all events as (id, title, date, capacity, duration_hours, type, instructor, created_by) tuples."""
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            yield from cursor.execute('''
+                SELECT id, title, date AS "date [DATETIME]", capacity, duration_hours, type, instructor, created_by FROM events
+            ''')
 
     def add_attendee(self, attendee):
         """Add an attendee to the database."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR IGNORE INTO attendees (id, name, email)
-            VALUES (?, ?, ?)
-        ''', (attendee.id, attendee.name, attendee.email))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO attendees (id, name, email)
+                VALUES (?, ?, ?)
+            ''', (attendee.id, attendee.name, attendee.email))
+            self.conn.commit()
+
+    def add_attendees_bulk(self, attendees):
+        """Add many attendees in a single transaction. Returns the number inserted."""
+        with self._write_lock, self.conn:
+            cursor = self.conn.executemany('''
+                INSERT OR IGNORE INTO attendees (id, name, email)
+                VALUES (?, ?, ?)
+            ''', [(a.id, a.name, a.email) for a in attendees])
+            return cursor.rowcount
 
     def register_attendee(self, event_id, attendee_id):
         """Register an attendee for an event."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM event_attendees WHERE event_id = ?', (event_id,))
-        current_attendees = cursor.fetchone()[0]
-        cursor.execute('SELECT capacity FROM events WHERE id = ?', (event_id,))
-        capacity = cursor.fetchone()
-        if capacity is None:
-            return False
-        capacity = capacity[0]
-        if current_attendees >= capacity:
-            return False
-        cursor.execute('''
-            INSERT OR IGNORE INTO event_attendees (event_id, attendee_id)
-            VALUES (?, ?)
-        ''', (event_id, attendee_id))
-        self.conn.commit()
-        return cursor.rowcount > 0
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            try:
+                if not self.conn.in_transaction:
+                    # Take the write lock before the capacity check so other
+                    # connections cannot register in between
+                    cursor.execute('BEGIN IMMEDIATE')
+                # The capacity check and the insert run as one statement; nothing is
+                # inserted if the event is missing or already full. "Full" means a
+                # row exists at offset capacity - 1, so the index scan stops after
+                # capacity entries rather than counting them all.
+                cursor.execute('''
+                    INSERT OR IGNORE INTO event_attendees (event_id, attendee_id)
+                    SELECT ?1, ?2 FROM events e
+                    WHERE e.id = ?1
+                      AND e.capacity > 0
+                      AND NOT EXISTS (
+                          SELECT 1 FROM event_attendees WHERE event_id = ?1
+                          LIMIT 1 OFFSET (SELECT capacity - 1 FROM events WHERE id = ?1)
+                      )
+                ''', (event_id, attendee_id))
+                self.conn.commit()
+            except Exception:
+                # Don't leave the writer holding the WAL write lock, e.g. after
+                # a foreign key failure for an unknown attendee
+                self.conn.rollback()
+                raise
+            return cursor.rowcount > 0
 
     def get_attendee_count(self, event_id):
         """Get the number of attendees for an event."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM event_attendees WHERE event_id = ?', (event_id,))
-        result = cursor.fetchone()
-        return result[0] if result else 0
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM event_attendees WHERE event_id = ?', (event_id,))
+            result = cursor.fetchone()
+            return result[0] if result else 0
 
     def delete_event(self, event_id):
         """Delete an event and its attendees."""
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM event_attendees WHERE event_id = ?', (event_id,))
-        cursor.execute('DELETE FROM schedule WHERE event_id = ?', (event_id,))
-        cursor.execute('DELETE FROM events WHERE id = ?', (event_id,))
-        self.conn.commit()
-        return cursor.rowcount > 0
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM event_attendees WHERE event_id = ?', (event_id,))
+            cursor.execute('DELETE FROM schedule WHERE event_id = ?', (event_id,))
+            cursor.execute('DELETE FROM events WHERE id = ?', (event_id,))
+            self.conn.commit()
+            self._events_version += 1
+            return cursor.rowcount > 0
 
     def update_event(self, event_id, title=None, date=None, capacity=None, duration_hours=None, type=None, instructor=None):
         """Update an event's details."""
-        cursor = self.conn.cursor()
-        updates = {}
-        if title: updates["title"] = title
-        if date: updates["date"] = date
-        if capacity: updates["capacity"] = capacity
-        if duration_hours: updates["duration_hours"] = duration_hours
-        if type: updates["type"] = type
-        if instructor: updates["instructor"] = instructor
-        if updates:
-            set_clause = ", ".join(f"{k} = ?" for k in updates.keys())
-            values = list(updates.values()) + [event_id]
-            cursor.execute(f'UPDATE events SET {set_clause} WHERE id = ?', values)
+        # Falsy values mean "leave unchanged"; COALESCE keeps the current column
+        # value for them, so the SQL text is constant and SQLite reuses the
+        # prepared statement across calls.
+        values = [title or None, date or None, capacity or None, duration_hours or None, type or None, instructor or None]
+        if not any(values):
+            return False
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                UPDATE events SET
+                    title = COALESCE(?, title),
+                    date = COALESCE(?, date),
+                    capacity = COALESCE(?, capacity),
+                    duration_hours = COALESCE(?, duration_hours),
+                    type = COALESCE(?, type),
+                    instructor = COALESCE(?, instructor)
+                WHERE id = ?
+            ''', values + [event_id])
             self.conn.commit()
+            self._events_version += 1
             return cursor.rowcount > 0
-        return False
 
     def add_schedule(self, event_id, start_ts, end_ts):
         """Add an event to the schedule table."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR IGNORE INTO schedule (event_id, start_ts, end_ts)
-            VALUES (?, ?, ?)
-        ''', (event_id, start_ts, end_ts))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO schedule (event_id, start_ts, end_ts)
+                VALUES (?, ?, ?)
+            ''', (event_id, start_ts, end_ts))
+            self.conn.commit()
 
     def remove_schedule(self, event_id):
         """Remove an event from the schedule table."""
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM schedule WHERE event_id = ?', (event_id,))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM schedule WHERE event_id = ?', (event_id,))
+            self.conn.commit()
 
     def get_schedule(self):
         """Retrieve all scheduled events."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT event_id, start_ts, end_ts FROM schedule')
-        return [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT event_id, start_ts, end_ts FROM schedule')
+            return [(row[0], row[1], row[2]) for row in cursor.fetchall()]
+
+    def find_schedule_conflict(self, start_ts, end_ts):
+        """Return the ID of a scheduled event overlapping [start_ts, end_ts), or None."""
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT event_id FROM schedule WHERE start_ts < ? AND end_ts > ? LIMIT 1', (end_ts, start_ts))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def get_next_scheduled(self, after_ts):
+        """Return (event_id, start_ts) of the first event starting at or after after_ts, or None."""
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT event_id, start_ts FROM schedule WHERE start_ts >= ? ORDER BY start_ts LIMIT 1', (after_ts,))
+            return cursor.fetchone()
 
     def add_user(self, user):
         """Add a user to the database."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO users (id, name, email, password, role)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user.id, user.name, user.email, user.password, user.role))
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                INSERT INTO users (id, name, email, password, role)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user.id, user.name, user.email, user.password, user.role))
+            self.conn.commit()
+
+    def update_user_password(self, user_id, password):
+        """Replace a user's stored password hash."""
+        with self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute('UPDATE users SET password = ? WHERE id = ?', (password, user_id))
+            self.conn.commit()
 
     def get_user_by_email(self, email):
         """Retrieve a user by email."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-        row = cursor.fetchone()
-        if row:
-            return {"id": row[0], "name": row[1], "email": row[2], "password": row[3], "role": row[4]}
-        return None
-
-    def list_attendees_for_event(self, event_id):
-        """Retrieve all attendees for an event."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT a.id, a.name, a.email FROM attendees a
-            JOIN event_attendees ea ON a.id = ea.attendee_id
-            WHERE ea.event_id = ?
-        ''', (event_id,))
-        rows = cursor.fetchall()
-        return [{"id": r[0], "name": r[1], "email": r[2]} for r in rows]
+        with self.get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
+            row = cursor.fetchone()
+            if row:
+                return {"id": row[0], "name": row[1], "email": row[2], "password": row[3], "role": row[4]}
+            return None
+
+    def iter_attendees_for_event(self, event_id):
+        """Yield (id, name, email) tuples for every attendee of an event."""
+        # The consumer is typically a streaming response that may take as long
+        # as the client does, so read over a dedicated connection rather than
+        # pinning one of the pool's
+        conn = self._connect(isolation_level=None)
+        try:
+            conn.execute("PRAGMA query_only=ON")
+            cursor = conn.execute('''
+                SELECT a.id, a.name, a.email FROM attendees a
+                JOIN event_attendees ea ON a.id = ea.attendee_id
+                WHERE ea.event_id = ?
+            ''', (event_id,))
+            while rows := cursor.fetchmany(STREAM_FETCH_ROWS):
+                yield from rows
+        finally:
+            conn.close()
+
+    def backup(self):
+        """Return an in-memory copy of the database, for use with restore()."""
+        snapshot = sqlite3.connect(":memory:", check_same_thread=False)
+        with self._write_lock:
+            self.conn.backup(snapshot)
+        return snapshot
+
+    def restore(self, snapshot):
+        """Replace the database contents with a copy taken by backup()."""
+        with self._write_lock:
+            snapshot.backup(self.conn)
+            self._events_version += 1
 
     def close(self):
-        """Close the database connection."""
-        self.conn.close()
\ No newline at end of file
+        """Close the writer and all pooled read connections."""
+        self.conn.close()
+        while not self._read_pool.empty():
+            self._read_pool.get_nowait().close()
+
+_db = None
+
+def get_database():
+    """Return the process-wide Database, opening it on first use."""
+    global _db
+    if _db is None:
+        _db = Database(os.getenv("DATABASE_PATH", "events.db"))
+    return _db
+
+async def get_db():
+    """FastAPI dependency for the shared Database (async, so it skips the threadpool)."""
+    return get_database()
+
+class AsyncDatabase:
+    def __init__(self, db_name="events.db", pool_size=READ_POOL_SIZE):
+        """
+        Read-only aiosqlite access for async endpoints.
+        Writes stay on the synchronous Database; this only serves SELECTs so
+        they can overlap with other awaited work on the event loop.
+        Connections are opened on demand and up to pool_size idle ones are kept.
+        """
+        self.db_name = db_name
+        self.pool_size = pool_size
+        self._idle = []
+
+    async def _connect(self):
+        """Open a read-only aiosqlite connection with the shared PRAGMAs applied."""
+        conn = aiosqlite.connect(self.db_name, detect_types=sqlite3.PARSE_COLNAMES, isolation_level=None)
+        # aiosqlite runs each connection on its own thread; don't let one that
+        # was never closed keep the interpreter alive
+        conn.daemon = True
+        await conn
+        for pragma in CONNECTION_PRAGMAS + ("PRAGMA query_only=ON",):
+            await conn.execute(pragma)
+        return conn
+
+    @asynccontextmanager
+    async def get_conn(self):
+        """Borrow an idle connection, opening a new one if none is free."""
+        conn = self._idle.pop() if self._idle else await self._connect()
+        try:
+            yield conn
+        finally:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+            else:
+                await conn.close()
+
+    async def list_events(self):
+        """Fetch (id, title, date) for all events in a single round trip."""
+        async with self.get_conn() as conn:
+            async with conn.execute('SELECT id, title, date AS "date [DATETIME]" FROM events') as cursor:
+                return await cursor.fetchall()
+
+    async def close(self):
+        """Close all idle connections."""
+        while self._idle:
+            await self._idle.pop().close()
\ No newline at end of file
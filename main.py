@@ -1,18 +1,19 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi import status
-from passlib.hash import bcrypt
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List, Literal
 from models import Event, Attendee, User
 from manager import EventManager, Scheduler
-from database import Database
-from auth import get_current_user, create_access_token, create_refresh_token, oauth2_scheme
+from database import AsyncDatabase, get_database
+from auth import get_current_user, create_access_token, create_refresh_token, oauth2_scheme, hash_password, verify_password, password_needs_rehash
 from utils import parse_date, check_event_permission, generate_csv
 import logging
+import orjson
 from contextlib import asynccontextmanager
-from jose import JWTError, jwt  # Added import for jwt and JWTError
+import jwt
 
 from dotenv import load_dotenv
 import os
@@ -29,17 +30,19 @@ REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS"))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database
-db = Database()
+# Database (shared with auth.get_current_user through get_db)
+db = get_database()
+async_db = AsyncDatabase(db.db_name)
 
 # FastAPI App
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     yield
     logger.info("Closing database connection")
+    await async_db.close()
     db.close()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -54,6 +57,9 @@ app.add_middleware(
 scheduler = Scheduler(db)
 manager = EventManager(db, scheduler)
 
+# Serialized GET /events response body, keyed by db.events_version
+_events_cache: dict[int, bytes] = {}
+
 # -------------------------------
 # Schemas
 # -------------------------------
@@ -111,23 +117,29 @@ class TokenResponse(BaseModel):
 # Auth Routes
 # -------------------------------
 @app.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED, summary="Register a new user")
-def register(user: UserRegister):
+async def register(user: UserRegister):
     """Register a new user with a specified role."""
-    existing = db.get_user_by_email(user.email)
+    # Hashing is CPU-bound and the database calls can block on the pool or the
+    # write lock; keep all of it off the event loop
+    existing = await run_in_threadpool(db.get_user_by_email, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
-    hashed = bcrypt.hash(user.password)
+    hashed = await run_in_threadpool(hash_password, user.password)
     user_obj = User(user.id, user.name, user.email, hashed, user.role)
-    db.add_user(user_obj)
+    await run_in_threadpool(db.add_user, user_obj)
     logger.info(f"User {user.email} registered with role {user.role}")
     return {"message": "User registered", "data": {"email": user.email}}
 
 @app.post("/login", response_model=TokenResponse, summary="Login and receive access/refresh tokens")
-def login(user: UserLogin):
+async def login(user: UserLogin):
     """Authenticate user and return access and refresh tokens."""
-    db_user = db.get_user_by_email(user.email)
-    if not db_user or not bcrypt.verify(user.password, db_user["password"]):
+    db_user = await run_in_threadpool(db.get_user_by_email, user.email)
+    if not db_user or not await run_in_threadpool(verify_password, user.password, db_user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if password_needs_rehash(db_user["password"]):
+        # Upgrade legacy bcrypt or outdated Argon2 hashes while the plaintext is at hand
+        hashed = await run_in_threadpool(hash_password, user.password)
+        await run_in_threadpool(db.update_user_password, db_user["id"], hashed)
     access_token = create_access_token(data={"sub": user.email})
     refresh_token = create_refresh_token(data={"sub": user.email})
     logger.info(f"User {user.email} logged in")
@@ -153,8 +165,8 @@ def refresh(token: str = Depends(oauth2_scheme)):
         access_token = create_access_token(data={"sub": email})
         logger.info(f"Token refreshed for {email}")
         return {"message": "Token refreshed", "data": {"access_token": access_token}}
-    except JWTError as e:
-        logger.error(f"JWTError: {str(e)}")
+    except jwt.InvalidTokenError as e:
+        logger.error(f"InvalidTokenError: {str(e)}")
         raise credentials_exception
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
@@ -171,7 +183,7 @@ def root():
 @app.post("/events", response_model=dict, status_code=status.HTTP_201_CREATED, summary="Create a new event")
 def create_event(event: EventCreate, current_user=Depends(get_current_user)):
     """Create a new event (organizers only)."""
-    if current_user["role"] != "organizer":
+    if current_user.role != "organizer":
         raise HTTPException(status_code=403, detail="Only organizers can create events")
     if event.capacity <= 0:
         raise HTTPException(status_code=400, detail="Capacity must be positive")
@@ -183,20 +195,26 @@ def create_event(event: EventCreate, current_user=Depends(get_current_user)):
         duration_hours=event.duration_hours,
         type=event.type,
         instructor=event.instructor,
-        created_by=current_user["id"]
+        created_by=current_user.id
     )
     if manager.add_event(evt):
         scheduler.schedule_event(evt)
-        logger.info(f"Event {event.id} created by {current_user['id']}")
+        logger.info(f"Event {event.id} created by {current_user.id}")
         return {"message": "Event created", "data": evt.display_details()}
     raise HTTPException(status_code=400, detail="Event ID already exists")
 
 @app.get("/events", response_model=dict, summary="List all events")
-def list_events():
+async def list_events():
     """Retrieve a list of all events."""
-    events = manager.list_events()
-    data = [{"id": e.id, "title": e.title, "date": str(e.date)} for e in events]
-    return {"message": "Events retrieved", "data": data}
+    version = db.events_version
+    body = _events_cache.get(version)
+    if body is None:
+        rows = await async_db.list_events()
+        data = [{"id": r[0], "title": r[1], "date": r[2]} for r in rows]
+        body = orjson.dumps({"message": "Events retrieved", "data": data})
+        _events_cache.clear()
+        _events_cache[version] = body
+    return Response(content=body, media_type="application/json")
 
 @app.put("/events/{event_id}", response_model=dict, summary="Update an event")
 def update_event(event_id: str, event: EventUpdate, current_user=Depends(get_current_user)):
@@ -217,7 +235,7 @@ def update_event(event_id: str, event: EventUpdate, current_user=Depends(get_cur
         instructor=event.instructor
     )
     if success:
-        logger.info(f"Event {event_id} updated by {current_user['id']}")
+        logger.info(f"Event {event_id} updated by {current_user.id}")
         return {"message": f"Event {event_id} updated", "data": manager.get_event(event_id).display_details()}
     raise HTTPException(status_code=400, detail="Update failed: invalid data or event not found")
 
@@ -229,7 +247,7 @@ def delete_event(event_id: str, current_user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Event not found")
     check_event_permission(evt, current_user)
     if manager.delete_event(event_id):
-        logger.info(f"Event {event_id} deleted by {current_user['id']}")
+        logger.info(f"Event {event_id} deleted by {current_user.id}")
         return {"message": f"Event {event_id} deleted", "data": {}}
     raise HTTPException(status_code=400, detail="Delete failed: event not found")
 
@@ -240,7 +258,7 @@ def get_next_event():
     if next_event:
         date, event_id = next_event
         event = manager.get_event(event_id)
-        return {"message": "Next event retrieved", "data": {"title": event.title, "date": str(date)}}
+        return {"message": "Next event retrieved", "data": {"title": event.title, "date": date}}
     return {"message": "No scheduled events", "data": {}}
 
 # -------------------------------
@@ -266,7 +284,6 @@ def export_attendees(event_id: str, current_user=Depends(get_current_user)):
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     check_event_permission(event, current_user)
-    attendees = db.list_attendees_for_event(event_id)
-    csv_data = generate_csv(attendees)
-    logger.info(f"Attendees exported for event {event_id} by {current_user['id']}")
+    csv_data = generate_csv(db.iter_attendees_for_event(event_id))
+    logger.info(f"Attendees exported for event {event_id} by {current_user.id}")
     return StreamingResponse(csv_data, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=attendees.csv"})
\ No newline at end of file
@@ -1,8 +1,6 @@
-import heapq
 from datetime import datetime, timedelta
 from models import Event
 from database import Database
-from intervaltree import IntervalTree
 from utils import parse_date
 
 class EventManager:
@@ -19,11 +17,10 @@ class EventManager:
         """Retrieve an event by ID."""
         event_data = self.db.get_event(event_id)
         if event_data:
-            date = parse_date(event_data["date"])
             return Event(
                 id=event_data["id"],
                 title=event_data["title"],
-                date=date,
+                date=event_data["date"],
                 capacity=event_data["capacity"],
                 duration_hours=event_data["duration_hours"],
                 type=event_data["type"],
@@ -34,30 +31,25 @@ class EventManager:
 
     def list_events(self) -> list[Event]:
         """Retrieve all events."""
-        db_events = self.db.list_events()
-        events = []
-        for e in db_events:
-            date = parse_date(e["date"])
-            evt = Event(
-                id=e["id"],
-                title=e["title"],
-                date=date,
-                capacity=e["capacity"],
-                duration_hours=e["duration_hours"],
-                type=e["type"],
-                instructor=e["instructor"],
-                created_by=e["created_by"]
+        return [
+            Event(
+                id=r[0],
+                title=r[1],
+                date=r[2],
+                capacity=r[3],
+                duration_hours=r[4],
+                type=r[5],
+                instructor=r[6],
+                created_by=r[7]
             )
-            events.append(evt)
-        return events
+            for r in self.db.iter_events()
+        ]
 
     def delete_event(self, event_id: str) -> bool:
         """Delete an event."""
-        event = self.get_event(event_id)
-        if event and self.db.delete_event(event_id):
-            self.scheduler.remove_event(event_id)
-            return True
-        return False
+        # db.delete_event also drops the schedule row and reports whether the
+        # event existed, so no separate lookup or scheduler call is needed
+        return self.db.delete_event(event_id)
 
     def update_event(self, event_id: str, title=None, date=None, capacity=None, duration_hours=None, type=None, instructor=None) -> bool:
         """Update an event and reschedule if date or duration changes."""
@@ -75,18 +67,8 @@ class EventManager:
 
 class Scheduler:
     def __init__(self, db: Database):
-        """Initialize Scheduler with database and load existing schedule."""
+        """Initialize Scheduler backed by the database schedule table."""
         self.db = db
-        self.event_queue = []
-        self.intervals = IntervalTree()
-        self.load_schedule()
-
-    def load_schedule(self):
-        """Load scheduled events from the database."""
-        for event_id, start_ts, end_ts in self.db.get_schedule():
-            self.intervals[start_ts:end_ts] = event_id
-            heapq.heappush(self.event_queue, (datetime.fromtimestamp(start_ts), event_id))
-        heapq.heapify(self.event_queue)
 
     def schedule_event(self, event: Event):
         """Schedule an event and check for conflicts."""
@@ -94,28 +76,22 @@ class Scheduler:
         end = start + timedelta(hours=event.duration_hours)
         start_ts = start.timestamp()
         end_ts = end.timestamp()
-        
-        if self.intervals.overlaps(start_ts, end_ts):
-            overlapping = self.intervals[start_ts:end_ts]
-            conflicting_id = next(iter(overlapping)).data
+
+        conflicting_id = self.db.find_schedule_conflict(start_ts, end_ts)
+        if conflicting_id is not None:
             conflicting_event = self.db.get_event(conflicting_id)
-            raise ValueError(f"Conflict with event {conflicting_event['title']} at {conflicting_event['date']}")
-        
-        self.intervals[start_ts:end_ts] = event.id
-        heapq.heappush(self.event_queue, (event.date, event.id))
+            raise ValueError(f"Conflict with event {conflicting_event['title']} at {conflicting_event['date'].isoformat()}")
+
         self.db.add_schedule(event.id, start_ts, end_ts)
 
     def remove_event(self, event_id: str):
         """Remove an event from the schedule."""
-        to_remove = [iv for iv in self.intervals if iv.data == event_id]
-        for iv in to_remove:
-            self.intervals.remove(iv)
-        self.event_queue = [(t, eid) for t, eid in self.event_queue if eid != event_id]
-        heapq.heapify(self.event_queue)
         self.db.remove_schedule(event_id)
 
     def get_next_event(self) -> tuple[datetime, str] | None:
         """Retrieve the next scheduled event."""
-        while self.event_queue and self.event_queue[0][0] < datetime.now():
-            heapq.heappop(self.event_queue)  # Remove past events
-        return self.event_queue[0] if self.event_queue else None
\ No newline at end of file
+        row = self.db.get_next_scheduled(datetime.now().timestamp())
+        if row is None:
+            return None
+        event_id, start_ts = row
+        return datetime.fromtimestamp(start_ts), event_id
\ No newline at end of file
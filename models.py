@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Event:
     id: str
     title: str
@@ -17,13 +17,13 @@ class Event:
         """Return a string representation of the event details."""
         return f"Event: {self.title}, Date: {self.date}, Capacity: {self.capacity}, Duration: {self.duration_hours} hours"
 
-@dataclass
+@dataclass(slots=True)
 class Attendee:
     id: str
     name: str
     email: str
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: str
     name: str
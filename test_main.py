@@ -1,30 +1,13 @@
 import pytest
-from fastapi.testclient import TestClient
-from main import app, db
-from passlib.hash import bcrypt
-from models import User
-from datetime import datetime
-
-@pytest.fixture
-def client():
-    return TestClient(app)
-
-@pytest.fixture
-def organizer_user():
-    user = User(
-        id="user1",
-        name="Test Organizer",
-        email="organizer@example.com",
-        password=bcrypt.hash("password123"),
-        role="organizer"
-    )
-    db.add_user(user)
-    return user
-
-@pytest.fixture
-def auth_headers(client, organizer_user):
-    response = client.post("/login", json={"email": "organizer@example.com", "password": "password123"})
-    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+from datetime import datetime, timedelta
+import bcrypt
+import sqlite3
+import time
+import jwt
+from auth import ALGORITHM, SECRET_KEY, _TOKEN_CACHE, create_access_token
+from database import Database
+from main import db, scheduler
+from models import Attendee, Event, User
 
 def test_register_user(client):
     response = client.post("/register", json={
@@ -43,7 +26,51 @@ def test_login_success(client, organizer_user):
     assert "access_token" in response.json()
     assert "refresh_token" in response.json()
 
-def test_create_event(auth_headers, client):
+def test_login_upgrades_legacy_bcrypt_hash(client):
+    user = User(
+        id="legacy1",
+        name="Legacy User",
+        email="legacy@example.com",
+        password=bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=4)).decode(),
+        role="attendee"
+    )
+    db.add_user(user)
+    response = client.post("/login", json={"email": "legacy@example.com", "password": "password123"})
+    assert response.status_code == 200
+    assert db.get_user_by_email("legacy@example.com")["password"].startswith("$argon2id$")
+
+def _export_as(client, token, event_id):
+    return client.get(f"/events/{event_id}/attendees/export", headers={"Authorization": f"Bearer {token}"})
+
+def test_token_cache_skips_user_lookup(client, monkeypatch, organizer_user, seeded_event):
+    _TOKEN_CACHE.clear()
+    lookups = []
+    get_user_by_email = db.get_user_by_email
+    monkeypatch.setattr(db, "get_user_by_email", lambda email: lookups.append(email) or get_user_by_email(email))
+    token = create_access_token(data={"sub": organizer_user.email})
+    assert _export_as(client, token, seeded_event).status_code == 200
+    assert _export_as(client, token, seeded_event).status_code == 200
+    assert lookups == [organizer_user.email]
+
+def test_token_cache_evicts_expired_token(client, organizer_user, seeded_event):
+    _TOKEN_CACHE.clear()
+    exp = int(time.time()) + 1
+    token = jwt.encode({"sub": organizer_user.email, "exp": exp}, SECRET_KEY, algorithm=ALGORITHM)
+    assert _export_as(client, token, seeded_event).status_code == 200
+    assert len(_TOKEN_CACHE) == 1
+    time.sleep(exp - time.time() + 0.1)
+    response = _export_as(client, token, seeded_event)
+    assert response.status_code == 401
+    assert len(_TOKEN_CACHE) == 0
+
+def test_token_cache_ignores_rejected_tokens(client, seeded_event):
+    _TOKEN_CACHE.clear()
+    no_sub = jwt.encode({"exp": int(time.time()) + 60}, SECRET_KEY, algorithm=ALGORITHM)
+    for token in ("not-a-jwt", no_sub):
+        assert _export_as(client, token, seeded_event).status_code == 401
+    assert len(_TOKEN_CACHE) == 0
+
+def test_create_event(client):
     response = client.post("/events", json={
         "id": "event1",
         "title": "Test Event",
@@ -52,7 +79,7 @@ def test_create_event(auth_headers, client):
         "duration_hours": 2.0,
         "type": "basic",
         "instructor": "John Doe"
-    }, headers=auth_headers)
+    })
     assert response.status_code == 201
     assert response.json()["message"] == "Event created"
 
@@ -62,18 +89,35 @@ def test_list_events(client):
     assert response.json()["message"] == "Events retrieved"
     assert isinstance(response.json()["data"], list)
 
-def test_register_attendee(client, auth_headers):
-    # Create event first
-    client.post("/events", json={
-        "id": "event1",
-        "title": "Test Event",
-        "date": "2025-05-01T10:00:00",
-        "capacity": 50,
-        "duration_hours": 2.0,
-        "type": "basic",
-        "instructor": "John Doe"
-    }, headers=auth_headers)
-    response = client.post("/events/event1/register", json={
+def _listed_titles(client):
+    return {e["id"]: e["title"] for e in client.get("/events").json()["data"]}
+
+def test_list_events_reflects_changes(client, seeded_event):
+    assert _listed_titles(client) == {seeded_event: "Seeded Event"}
+    response = client.post("/events", json={
+        "id": "event9",
+        "title": "Cached Event",
+        "date": "2025-05-05T10:00:00",
+        "capacity": 10,
+        "duration_hours": 1.0,
+        "type": "basic"
+    })
+    assert response.status_code == 201
+    assert _listed_titles(client) == {seeded_event: "Seeded Event", "event9": "Cached Event"}
+    assert client.put("/events/event9", json={"title": "Renamed Event"}).status_code == 200
+    assert _listed_titles(client) == {seeded_event: "Seeded Event", "event9": "Renamed Event"}
+    assert client.delete("/events/event9").status_code == 200
+    assert _listed_titles(client) == {seeded_event: "Seeded Event"}
+
+def test_list_events_reflects_restore(client, organizer_user, seeded_event):
+    snapshot = db.backup()
+    db.add_event(Event("event9", "Restored Away", datetime(2025, 5, 5, 10, 0), 10, 1.0, created_by=organizer_user.id))
+    assert "event9" in _listed_titles(client)
+    db.restore(snapshot)
+    assert _listed_titles(client) == {seeded_event: "Seeded Event"}
+
+def test_register_attendee(client, seeded_event):
+    response = client.post(f"/events/{seeded_event}/register", json={
         "id": "attendee1",
         "name": "Test Attendee",
         "email": "attendee@example.com"
@@ -81,7 +125,7 @@ def test_register_attendee(client, auth_headers):
     assert response.status_code == 200
     assert response.json()["message"].startswith("Test Attendee registered")
 
-def test_invalid_capacity(auth_headers, client):
+def test_invalid_capacity(client):
     response = client.post("/events", json={
         "id": "event2",
         "title": "Invalid Event",
@@ -89,6 +133,162 @@ def test_invalid_capacity(auth_headers, client):
         "capacity": 0,
         "duration_hours": 1.0,
         "type": "basic"
-    }, headers=auth_headers)
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Capacity must be positive"
+
+def test_export_attendees(client, seeded_event):
+    for attendee in (Attendee("attendee1", "Ann", "ann@example.com"), Attendee("attendee2", 'Doe, "J"', "doe@example.com")):
+        db.add_attendee(attendee)
+        db.register_attendee(seeded_event, attendee.id)
+    response = client.get(f"/events/{seeded_event}/attendees/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == 'ID,Name,Email\r\nattendee1,Ann,ann@example.com\r\nattendee2,"Doe, ""J""",doe@example.com\r\n'
+
+def test_invalid_date(client):
+    response = client.post("/events", json={
+        "id": "event3",
+        "title": "Undated Event",
+        "date": "not a date",
+        "capacity": 10,
+        "duration_hours": 1.0,
+        "type": "basic"
+    })
     assert response.status_code == 400
-    assert response.json()["detail"] == "Capacity must be positive"
\ No newline at end of file
+    assert response.json()["detail"] == "Invalid date format"
+
+def test_create_event_unpadded_date(client):
+    response = client.post("/events", json={
+        "id": "event4",
+        "title": "Unpadded Date Event",
+        "date": "2025-5-3 9:00",
+        "capacity": 10,
+        "duration_hours": 1.0,
+        "type": "basic"
+    })
+    assert response.status_code == 201
+    assert db.get_event("event4")["date"] == datetime(2025, 5, 3, 9, 0)
+
+def test_export_does_not_hold_a_pool_connection(tmp_path, organizer_user):
+    small_db = Database(str(tmp_path / "pool.db"), read_pool_size=1)
+    small_db.add_user(organizer_user)
+    small_db.add_event(Event("event5", "Export Event", datetime(2025, 6, 2, 10, 0), 10, 1.0, created_by=organizer_user.id))
+    for attendee in (Attendee("attendee1", "Ann", "ann@example.com"), Attendee("attendee2", "Bob", "bob@example.com")):
+        small_db.add_attendee(attendee)
+        small_db.register_attendee("event5", attendee.id)
+    rows = small_db.iter_attendees_for_event("event5")
+    first = next(rows)
+    # A half-sent export must not starve other reads of the single pooled connection
+    assert small_db.get_user_by_email(organizer_user.email)["id"] == organizer_user.id
+    assert sorted([first, *rows]) == [("attendee1", "Ann", "ann@example.com"), ("attendee2", "Bob", "bob@example.com")]
+    small_db.close()
+
+def _add_capacity_event(event_id, capacity, organizer):
+    db.add_event(Event(event_id, "Capacity Event", datetime(2025, 7, 1, 10, 0), capacity, 1.0, created_by=organizer.id))
+    for i in range(4):
+        db.add_attendee(Attendee(f"cap_attendee{i}", f"Attendee {i}", f"cap{i}@example.com"))
+
+def test_register_attendee_up_to_capacity(organizer_user):
+    _add_capacity_event("event6", 2, organizer_user)
+    assert db.register_attendee("event6", "cap_attendee0")
+    assert db.register_attendee("event6", "cap_attendee1")
+    assert not db.register_attendee("event6", "cap_attendee2")
+    assert db.get_attendee_count("event6") == 2
+
+def test_register_attendee_unknown_event(organizer_user):
+    _add_capacity_event("event6", 2, organizer_user)
+    assert not db.register_attendee("no_such_event", "cap_attendee0")
+
+def test_register_attendee_zero_capacity(organizer_user):
+    _add_capacity_event("event6", 0, organizer_user)
+    assert not db.register_attendee("event6", "cap_attendee0")
+
+def test_register_attendee_after_capacity_reduced(organizer_user):
+    _add_capacity_event("event6", 3, organizer_user)
+    assert db.register_attendee("event6", "cap_attendee0")
+    assert db.register_attendee("event6", "cap_attendee1")
+    db.update_event("event6", capacity=1)
+    assert not db.register_attendee("event6", "cap_attendee2")
+    assert db.get_attendee_count("event6") == 2
+
+def test_register_unknown_attendee_rolls_back(seeded_event):
+    with pytest.raises(sqlite3.IntegrityError):
+        db.register_attendee(seeded_event, "ghost")
+    assert not db.conn.in_transaction
+
+def _bulk_event(event_id, created_by):
+    return Event(event_id, f"Bulk {event_id}", datetime(2025, 8, 1, 10, 0), 10, 1.0, created_by=created_by)
+
+def test_add_events_bulk(organizer_user, seeded_event):
+    version = db.events_version
+    events = [_bulk_event(f"bulk{i}", organizer_user.id) for i in range(3)]
+    # The repeated bulk0 and the existing seeded event are ignored
+    assert db.add_events_bulk(events + [events[0], _bulk_event(seeded_event, organizer_user.id)]) == 3
+    assert db.events_version != version
+    assert db.get_event(seeded_event)["title"] == "Seeded Event"
+    # Bulk-loaded events are not scheduled
+    assert [row[0] for row in db.get_schedule()] == [seeded_event]
+
+def test_add_events_bulk_is_all_or_nothing(organizer_user):
+    events = [_bulk_event("bulk0", organizer_user.id), _bulk_event("bulk1", "no_such_user")]
+    with pytest.raises(sqlite3.IntegrityError):
+        db.add_events_bulk(events)
+    assert db.get_event("bulk0") is None
+
+def test_add_attendees_bulk():
+    attendees = [Attendee(f"bulk_attendee{i}", f"Attendee {i}", f"bulk{i}@example.com") for i in range(3)]
+    assert db.add_attendees_bulk(attendees + attendees[:2]) == 3
+    assert db.add_attendees_bulk(attendees) == 0
+
+def test_add_attendees_bulk_is_all_or_nothing():
+    valid = Attendee("bulk_attendee0", "Attendee 0", "bulk0@example.com")
+    unbindable = Attendee("bulk_attendee1", object(), "bulk1@example.com")
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.add_attendees_bulk([valid, unbindable])
+    assert db.add_attendees_bulk([valid]) == 1
+
+def _event_at(event_id, start, duration_hours, organizer):
+    return Event(event_id, f"Event {event_id}", start, 10, duration_hours, created_by=organizer.id)
+
+def test_schedule_rejects_overlap(organizer_user, seeded_event):
+    # The seeded event runs 2025-06-01 10:00-12:00
+    event = _event_at("event7", datetime(2025, 6, 1, 11, 0), 2.0, organizer_user)
+    db.add_event(event)
+    with pytest.raises(ValueError, match="Conflict with event Seeded Event"):
+        scheduler.schedule_event(event)
+
+def test_schedule_allows_back_to_back(organizer_user, seeded_event):
+    # Intervals are half-open: ending at the seeded event's 10:00 start, or
+    # starting at its 12:00 end, is not a conflict
+    seeded_start = datetime(2025, 6, 1, 10, 0).timestamp()
+    seeded_end = datetime(2025, 6, 1, 12, 0).timestamp()
+    assert db.find_schedule_conflict(seeded_start - 3600, seeded_start) is None
+    assert db.find_schedule_conflict(seeded_end, seeded_end + 3600) is None
+    for event in (_event_at("event7", datetime(2025, 6, 1, 9, 0), 1.0, organizer_user),
+                  _event_at("event8", datetime(2025, 6, 1, 12, 0), 1.0, organizer_user)):
+        db.add_event(event)
+        scheduler.schedule_event(event)
+    assert sorted(row[0] for row in db.get_schedule()) == ["event7", "event8", seeded_event]
+
+def test_scheduler_next_skips_past_events(client, organizer_user, seeded_event):
+    soon = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    for event in (_event_at("event8", soon + timedelta(days=1), 1.0, organizer_user),
+                  _event_at("event7", soon, 1.0, organizer_user)):
+        db.add_event(event)
+        scheduler.schedule_event(event)
+    response = client.get("/scheduler/next")
+    assert response.status_code == 200
+    assert response.json()["data"] == {"title": "Event event7", "date": soon.isoformat()}
+
+def test_update_event_reschedules(client, organizer_user, seeded_event):
+    response = client.put(f"/events/{seeded_event}", json={"date": "2025-06-02T10:00:00"})
+    assert response.status_code == 200
+    # The old slot is free again and the new one is taken
+    old_slot = _event_at("event7", datetime(2025, 6, 1, 10, 0), 2.0, organizer_user)
+    db.add_event(old_slot)
+    scheduler.schedule_event(old_slot)
+    new_slot = _event_at("event8", datetime(2025, 6, 2, 11, 0), 1.0, organizer_user)
+    db.add_event(new_slot)
+    with pytest.raises(ValueError, match="Conflict with event Seeded Event"):
+        scheduler.schedule_event(new_slot)
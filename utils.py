@@ -1,31 +1,67 @@
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain, islice
 from fastapi import HTTPException
 from io import StringIO
 import csv
+import re
 
+# Attendee rows written per chunk of a streamed CSV export
+CSV_BATCH_ROWS = 500
+
+# Characters that make csv.writer quote a field
+_CSV_SPECIAL = re.compile(r'[,"\r\n]')
+
+# The "%Y-%m-%d %H:%M" fallback format, compiled once. The field patterns are
+# the ones strptime builds for those directives, so the same strings match.
+_DT_RE = re.compile(r"(\d{4})-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])\s+(2[0-3]|[01]\d|\d):([0-5]\d|\d)")
+
+# Error responses raised from hot validation paths, built once and reused
+_INVALID_DATE = HTTPException(status_code=400, detail="Invalid date format")
+_FORBIDDEN = HTTPException(status_code=403, detail="Access denied: you are not the event organizer")
+
+# datetimes are immutable, so cached results can be shared between callers
+@lru_cache(maxsize=1024)
 def parse_date(date_str: str) -> datetime:
     """Parse a date string into a datetime object."""
     try:
         return datetime.fromisoformat(date_str)
     except ValueError:
+        pass
+    # fromisoformat requires zero-padded fields; the fallback also takes
+    # "2025-5-1 9:00". Matching _DT_RE skips strptime's per-call format handling.
+    match = _DT_RE.fullmatch(date_str)
+    if match is not None:
         try:
-            return datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format")
+            return datetime(*map(int, match.groups()))
+        except ValueError:  # well-formed but out of range, e.g. 2025-2-30
+            pass
+    # Reset the traceback so the shared instance doesn't accumulate frames
+    raise _INVALID_DATE.with_traceback(None)
 
 def check_event_permission(event, current_user):
     """Check if the user has permission to modify an event."""
-    if current_user["role"] == "admin":
-        return
-    if event.created_by != current_user["id"]:
-        raise HTTPException(status_code=403, detail="Access denied: you are not the event organizer")
+    if current_user.role != "admin" and event.created_by != current_user.id:
+        raise _FORBIDDEN.with_traceback(None)
 
-def generate_csv(attendees):
-    """Generate a CSV string from a list of attendees."""
+def _drain(buffer):
+    """Return the buffer's contents as UTF-8 bytes and reset it for reuse."""
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return data
+
+def generate_csv(rows):
+    """Yield UTF-8 encoded CSV for (id, name, email) attendee rows: the header, then one chunk per batch."""
     buffer = StringIO()
     writer = csv.writer(buffer)
     writer.writerow(["ID", "Name", "Email"])
-    for a in attendees:
-        writer.writerow([a["id"], a["name"], a["email"]])
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    yield _drain(buffer)
+    rows = iter(rows)
+    while batch := list(islice(rows, CSV_BATCH_ROWS)):
+        if _CSV_SPECIAL.search("".join(chain.from_iterable(batch))):
+            writer.writerows(batch)
+            yield _drain(buffer)
+        else:
+            # Nothing to quote or escape: plain joins produce what csv.writer would
+            yield "".join([",".join(row) + "\r\n" for row in batch]).encode()